@@ -0,0 +1,108 @@
+import itertools
+
+"""
+action_path.py
+
+This file contains a compact representation of a solution (a sequence of
+actions).
+"""
+
+# Largest number of action symbols written to a stream at once
+WRITE_CHUNK = 1 << 16
+
+
+class ActionPath:
+    """
+    Sequence of actions packed into a bytearray, one byte (the action's
+    symbol) per move. Iterating over an ActionPath yields the individual
+    actions in order.
+
+    The bytes are the output symbols themselves, so the path is written,
+    counted and decoded by C-level bytearray operations without an unpacking
+    pass (packing two bits per move would make it four times smaller, but
+    every use of the path would then have to unpack it in Python or NumPy).
+    """
+
+    def __init__(self, moves=None):
+        self.moves = moves if moves is not None else bytearray()
+
+    @classmethod
+    def from_actions(cls, actions):
+        """
+        Create an ActionPath from a sequence of individual actions.
+        :param actions: iterable of actions (e.g. a list or string)
+        :return: new ActionPath
+        """
+        return cls(bytearray(''.join(actions).encode('ascii')))
+
+    @classmethod
+    def from_reversed(cls, actions):
+        """
+        Create an ActionPath from actions given last to first (the order in
+        which they are found when following a search tree back from the
+        goal). The actions are packed as they are produced, so a generator
+        never needs the whole path held as a list.
+        :param actions: iterable of actions, from the last to the first
+        :return: new ActionPath
+        """
+        moves = bytearray(map(ord, actions))
+        moves.reverse()
+        return cls(moves)
+
+    def append(self, action):
+        """
+        Add an action to the end of the path.
+        """
+        self.moves.append(ord(action))
+
+    def reverse(self):
+        """
+        Reverse the path in place (paths are built backwards from the goal).
+        """
+        self.moves.reverse()
+
+    def total_cost(self, action_cost):
+        """
+        Compute the total cost of the path.
+        :param action_cost: dict of action costs (e.g. MazeEnv.ACTION_COST)
+        :return: total cost
+        """
+        return sum(cost * self.moves.count(action.encode('ascii'))
+                   for action, cost in action_cost.items())
+
+    def chunks(self):
+        """
+        Yield the path as strings of at most WRITE_CHUNK action symbols.
+        """
+        for i in range(0, len(self.moves), WRITE_CHUNK):
+            yield self.moves[i:i + WRITE_CHUNK].decode('ascii')
+
+    def write(self, f):
+        """
+        Write the path to the given text stream in the output symbol format
+        (one symbol per action, followed by a newline), one chunk at a time.
+        :param f: writable text file object
+        """
+        for chunk in self.chunks():
+            f.write(chunk)
+        f.write('\n')
+
+    def __len__(self):
+        return len(self.moves)
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.chunks())
+
+    def __eq__(self, other):
+        if isinstance(other, ActionPath):
+            return self.moves == other.moves
+        if isinstance(other, (list, tuple, str)):
+            return len(self) == len(other) and \
+                all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __str__(self):
+        return self.moves.decode('ascii')
+
+    def __repr__(self):
+        return f'ActionPath({str(self)!r})'
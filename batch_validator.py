@@ -0,0 +1,213 @@
+import sys
+import time
+
+import numpy as np
+
+from maze_env import MazeEnv
+
+"""
+batch_validator.py
+
+This file contains a vectorised validator which checks many candidate
+solutions (action sequences) against the same maze at once.
+"""
+
+# Largest number of actions validated in a single vectorised batch (each
+# action needs about 16 bytes of temporary arrays; a longer sequence is
+# validated in a batch of its own)
+MAX_BATCH_ACTIONS = 1 << 22
+
+
+def print_usage():
+    print("Usage: python batch_validator.py [testcase_file] [solutions_file]")
+    print("    testcase_file = filename of a valid testcase file \
+          (e.g. L1.txt)")
+    print("    solutions_file = file containing one solution (a string of \
+          action symbols) per line")
+
+
+class ValidationResult:
+    """
+    Outcome of checking a single action sequence. collision_step is the index
+    of the first action which collides, leaves the maze or is not a valid
+    action (None if there is no such action).
+    """
+
+    def __init__(self, solved, cost, collision_step, optimal):
+        self.solved = solved
+        self.cost = cost
+        self.collision_step = collision_step
+        self.optimal = optimal
+
+    def __repr__(self):
+        return f'solved: {self.solved},\t cost: {self.cost},\t collision ' \
+               f'step: {self.collision_step},\t optimal: {self.optimal}'
+
+
+class BatchValidator:
+    """
+    Validates action sequences against a maze. Each sequence is converted to
+    an array of flat index deltas over the wall mask, the position after
+    every step is found with a cumulative sum, and every step of every
+    sequence in a batch is checked against the wall mask at once. The mask
+    is padded with a solid border, so leaving the maze is a collision like
+    walking into a wall and needs no separate bounds checks.
+
+    A sequence is solved if none of its actions collide and it finishes at the
+    exit. (Unlike MazeEnv.perform_action, which leaves the player in place
+    after a collision, positions after the first collision are not
+    meaningful, so any collision means the sequence is not solved.)
+    """
+
+    def __init__(self, maze_env):
+        self.maze_env = maze_env
+        width = maze_env.n_cols + 2
+        walls = np.ones((maze_env.n_rows + 2, width), dtype=bool)
+        walls[1:-1, 1:-1] = np.frombuffer(
+            ''.join(''.join(row) for row in maze_env.grid_data).encode(),
+            dtype=np.uint8).reshape(maze_env.n_rows, maze_env.n_cols) \
+            == ord(MazeEnv.SOLID_TILE)
+        self.walls = walls.ravel()
+        self.init = (maze_env.init_row + 1) * width + maze_env.init_col + 1
+        self.exit = (maze_env.exit_row + 1) * width + maze_env.exit_col + 1
+
+        # Lookup tables from action symbol (byte) to flat index delta (0 for
+        # symbols which are not valid actions) and cost
+        self.delta = np.zeros(256, dtype=np.int32)
+        self.action_cost = np.zeros(256, dtype=np.float64)
+        deltas = {MazeEnv.LEFT: -1, MazeEnv.RIGHT: 1, MazeEnv.DOWN: width,
+                  MazeEnv.UP: -width}
+        for action in MazeEnv.ACTIONS:
+            code = ord(action)
+            self.delta[code] = deltas[action]
+            self.action_cost[code] = MazeEnv.ACTION_COST[action]
+
+        # With uniform action costs (as in MazeEnv), the cost of a sequence
+        # only depends on its number of valid actions
+        costs = set(MazeEnv.ACTION_COST[a] for a in MazeEnv.ACTIONS)
+        self.uniform_cost = costs.pop() if len(costs) == 1 else None
+
+    def validate(self, sequences):
+        """
+        Validate each of the given action sequences.
+        :param sequences: list of action sequences (strings of action
+                          symbols, lists of actions or ActionPaths)
+        :return: list of ValidationResult (in the same order)
+        """
+        sequences = [s if isinstance(s, str) else ''.join(s)
+                     for s in sequences]
+        results = []
+        batch = []
+        batch_actions = 0
+        for sequence in sequences:
+            if len(batch) > 0 and \
+               batch_actions + len(sequence) > MAX_BATCH_ACTIONS:
+                results.extend(self.validate_batch(batch))
+                batch = []
+                batch_actions = 0
+            batch.append(sequence)
+            batch_actions += len(sequence)
+        if len(batch) > 0:
+            results.extend(self.validate_batch(batch))
+        return results
+
+    def validate_batch(self, sequences):
+        """
+        Validate a batch of action sequences with a single set of vectorised
+        operations over all of their actions.
+        :param sequences: list of strings of action symbols
+        :return: list of ValidationResult
+        """
+        maze_env = self.maze_env
+        lengths = np.array([len(s) for s in sequences], dtype=np.int64)
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        # Symbols which are not ASCII become '?' (an invalid action)
+        codes = np.frombuffer(''.join(sequences).encode('ascii', 'replace'),
+                              dtype=np.uint8)
+
+        deltas = self.delta[codes]
+        # Every valid action moves, so the invalid actions have no delta
+        invalid = deltas == 0
+
+        # Flat position after each step. The first delta of each sequence
+        # also cancels the sum of the previous sequence's deltas, so that a
+        # single running sum restarts at the start of every sequence. The
+        # int32 sums wrap around on long inputs, but wrapping is exact modulo
+        # 2 ** 32, so every position up to a sequence's first collision
+        # (which stays inside the padded grid) is correct, and the positions
+        # after it are never used.
+        nonempty = starts[lengths > 0]
+        if len(nonempty) > 1:
+            sums = np.add.reduceat(deltas, nonempty, dtype=np.int32)
+            deltas[nonempty[1:]] -= sums[:-1]
+        positions = np.cumsum(deltas, dtype=np.int32)
+        positions += self.init
+
+        # Steps which are invalid actions or end inside a wall (or the
+        # border); positions outside the mask can only follow a collision, so
+        # clipping them does not change the first collision
+        collided = self.walls.take(positions, mode='clip')
+        collided |= invalid
+
+        # First collision in each sequence
+        collision_step = np.full(len(sequences), -1, dtype=np.int64)
+        steps = np.flatnonzero(collided)
+        owner = np.searchsorted(ends, steps, side='right')
+        owner, first = np.unique(owner, return_index=True)
+        collision_step[owner] = steps[first] - starts[owner]
+
+        # Total cost of each sequence
+        if self.uniform_cost is not None:
+            n_valid = lengths
+            if invalid.any():
+                n_invalid = np.concatenate(([0], np.cumsum(invalid)))
+                n_valid = lengths - (n_invalid[ends] - n_invalid[starts])
+            total_cost = self.uniform_cost * n_valid
+        else:
+            costs = np.concatenate(([0.0],
+                                    np.cumsum(self.action_cost[codes])))
+            total_cost = costs[ends] - costs[starts]
+
+        # Final position of each sequence (the initial position if empty)
+        last = np.maximum(ends - 1, 0)
+        final = np.where(lengths > 0,
+                         positions[last] if len(positions) > 0 else 0,
+                         self.init)
+        solved = (collision_step < 0) & (final == self.exit)
+        optimal = solved & (total_cost == maze_env.optimal_cost)
+
+        return [ValidationResult(bool(solved[i]), float(total_cost[i]),
+                                 int(collision_step[i])
+                                 if collision_step[i] >= 0 else None,
+                                 bool(optimal[i]))
+                for i in range(len(sequences))]
+
+
+def main(arglist):
+    if len(arglist) != 2:
+        print_usage()
+        return
+
+    maze_env = MazeEnv(arglist[0])
+    try:
+        with open(arglist[1], 'r') as f:
+            sequences = [line.rstrip('\r\n') for line in f]
+    except FileNotFoundError:
+        print("/!\\ ERROR: Solutions file not found")
+        return
+
+    t0 = time.time()
+    results = BatchValidator(maze_env).validate(sequences)
+    run_time = time.time() - t0
+
+    for i, result in enumerate(results):
+        print(f"Solution {i}: {result}")
+    print(f"Solutions solved: {sum(r.solved for r in results)}/"
+          f"{len(results)}\nSolutions optimal: "
+          f"{sum(r.optimal for r in results)}/{len(results)}\n"
+          f"Time to validate solutions: {round(run_time, 10)} seconds")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
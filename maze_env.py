@@ -45,11 +45,32 @@ class MazeEnv:
         except FileNotFoundError:
             assert False, '/!\\ ERROR: Testcase file not found'
 
+        with f:
+            self._load(f)
+
+    @classmethod
+    def from_string(cls, text):
+        """
+        Create a new maze environment instance from the contents of a maze
+        input file (rather than from the file itself).
+        :param text: maze input file contents
+        :return: new MazeEnv
+        """
+        maze_env = cls.__new__(cls)
+        maze_env._load(text.splitlines())
+        return maze_env
+
+    def _load(self, f):
+        """
+        Parse the lines of a maze input file into this environment.
+        :param f: iterable of maze input file lines
+        """
         grid_data = []
         i = 0
 
         for line in f: # Read the maze input file
-            if line.strip()[0] == '#': # Skip commented lines in the file
+            # Skip blank and commented lines in the file
+            if len(line.strip()) == 0 or line.strip()[0] == '#':
                 continue
 
             if i == 0: 
@@ -74,6 +95,11 @@ class MazeEnv:
 
             i += 1
 
+        assert i >= 2, '/!\\ ERROR: Invalid input file - missing n_rows, \
+            n_cols or optimal path cost'
+        assert len(grid_data) == self.n_rows, f'/!\\ ERROR: Invalid input \
+            file - incorrect number of map rows'
+
         # Find initial and exit positions for the maze
         self.init_row, self.init_col = None, None
         self.exit_row, self.exit_col = None, None
@@ -100,9 +126,6 @@ class MazeEnv:
         assert self.exit_row is not None and self.exit_col is not None, \
             '/!\\ ERROR: Invalid input file - No exit position'
 
-        assert len(grid_data) == self.n_rows, f'/!\\ ERROR: Invalid input \
-            file - incorrect number of map rows'
-
         self.grid_data = grid_data
 
     def get_init_state(self):
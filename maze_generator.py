@@ -0,0 +1,475 @@
+import random
+import sys
+import time
+
+import numpy as np
+
+from maze_env import MazeEnv
+
+"""
+maze_generator.py
+
+This file contains a seeded maze generator (recursive backtracker, randomised
+Kruskal, randomised Prim, and room and corridor layouts) which writes mazes in
+the input file format read by MazeEnv.
+"""
+
+SOLID = ord(MazeEnv.SOLID_TILE)
+AIR = ord(MazeEnv.AIR_TILE)
+PLAYER = ord(MazeEnv.PLAYER_TILE)
+EXIT = ord(MazeEnv.EXIT_TILE)
+
+# Frontiers at least this large are expanded with NumPy when computing the
+# optimal path cost
+BFS_VECTOR_THRESHOLD = 256
+
+# Smallest number of room placements attempted by the rooms layout
+MIN_ROOM_ATTEMPTS = 20
+
+
+def print_usage():
+    print("Usage: python maze_generator.py [algorithm] [n_rows] [n_cols] \
+          [output_file] [seed (optional)]")
+    print("    algorithm = 'backtracker' or 'kruskal' or 'prim' or 'rooms'")
+    print("    output_file = filename to write the maze to ('-' for stdout)")
+
+
+class MazeGenerator:
+    """
+    Generates a maze of the given dimensions. The grid is stored as a NumPy
+    array of tile symbols (as bytes) backed by a bytearray, so it can be
+    carved cell by cell from Python, carved in blocks with NumPy slices, and
+    written out row by row without being copied.
+
+    The perfect maze algorithms work on a lattice of cells at odd grid
+    coordinates, with the walls between neighbouring cells at the coordinates
+    in between. The outer border of the grid is always solid.
+    """
+
+    ALGORITHMS = ['backtracker', 'kruskal', 'prim', 'rooms']
+
+    def __init__(self, n_rows, n_cols, seed=None):
+        assert n_rows >= 3 and n_cols >= 3 and (n_rows >= 5 or n_cols >= 5),\
+            '/!\\ ERROR: Maze too small (must have room for at least two cells)'
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.rng = np.random.default_rng(seed)
+        self.random = random.Random(seed)
+
+        # Number of cells in the lattice of odd coordinates
+        self.cell_rows = (n_rows - 1) // 2
+        self.cell_cols = (n_cols - 1) // 2
+
+        self.buffer = bytearray([SOLID]) * (n_rows * n_cols)
+        self.grid = np.frombuffer(self.buffer, dtype=np.uint8).reshape(
+            n_rows, n_cols)
+        self.init_row, self.init_col = None, None
+        self.exit_row, self.exit_col = None, None
+        self.optimal_cost = None
+        # Whether the maze only connects cells of the lattice (see below)
+        self.lattice = False
+
+    def generate(self, algorithm):
+        """
+        Generate a maze using the given algorithm and compute its optimal path
+        cost.
+        :param algorithm: an element of MazeGenerator.ALGORITHMS
+        """
+        assert algorithm in self.ALGORITHMS, \
+            '/!\\ ERROR: Invalid generation algorithm given'
+        getattr(self, 'generate_' + algorithm)()
+        self.optimal_cost = self.compute_optimal_cost()
+
+    def open_cells(self):
+        """
+        Open every cell of the lattice (perfect maze algorithms only need to
+        decide which walls between cells to open).
+        """
+        self.grid[1:2 * self.cell_rows:2, 1:2 * self.cell_cols:2] = AIR
+        self.lattice = True
+
+    def cell_status(self, other):
+        """
+        Create a status array over the flat grid, padded by two rows on each
+        side so that the cells two steps away from any cell can be looked up
+        without bounds checks. Cells are 0 and every other position (walls,
+        border and padding) is set to the given value.
+        :param other: status of non-cell positions
+        :return: (status bytearray, padding offset)
+        """
+        pad = 2 * self.n_cols + 2
+        n_tiles = self.n_rows * self.n_cols
+        status = bytearray([other]) * (n_tiles + 2 * pad)
+        view = np.frombuffer(status, dtype=np.uint8)
+        view[pad:pad + n_tiles].reshape(self.n_rows, self.n_cols)[
+            1:2 * self.cell_rows:2, 1:2 * self.cell_cols:2] = 0
+        return status, pad
+
+    def place_corners(self):
+        """
+        Place the player in the top left cell and the exit in the bottom right
+        cell.
+        """
+        self.init_row, self.init_col = 1, 1
+        self.exit_row = 2 * self.cell_rows - 1
+        self.exit_col = 2 * self.cell_cols - 1
+
+    # === Recursive Backtracker ===============================================
+    def generate_backtracker(self):
+        """
+        Generate a perfect maze using the recursive backtracker (randomised
+        depth first search). Uses an explicit stack, so there is no recursion
+        limit on the maze size.
+        """
+        self.open_cells()
+        status, pad = self.cell_status(1)
+        buffer = self.buffer
+        randrange = self.random.randrange
+        offsets = (-2, 2, 2 * self.n_cols, -2 * self.n_cols)
+
+        # Positions are padded flat grid indices
+        position = self.n_cols + 1 + pad
+        status[position] = 1
+        stack = [position]
+
+        while (len(stack) > 0):
+            position = stack[-1]
+            unvisited = [o for o in offsets if not status[position + o]]
+            if len(unvisited) == 0:
+                stack.pop()
+                continue
+            offset = unvisited[randrange(len(unvisited))]
+            status[position + offset] = 1
+            buffer[position + (offset >> 1) - pad] = AIR
+            stack.append(position + offset)
+
+        self.place_corners()
+
+    # === Randomised Kruskal ==================================================
+    def generate_kruskal(self):
+        """
+        Generate a perfect maze using randomised Kruskal's algorithm, joining
+        cells along edges taken in a random order whenever they are not
+        already connected.
+
+        Kruskal's algorithm builds the minimum spanning tree for the random
+        edge order, so the same tree is computed here with vectorised Boruvka
+        rounds over a union-find array of component labels: each component
+        takes its earliest outgoing edge, and the joined components are
+        merged by pointer jumping.
+        """
+        self.open_cells()
+        n_cells = self.cell_rows * self.cell_cols
+        cells = np.arange(n_cells, dtype=np.int64).reshape(self.cell_rows,
+                                                           self.cell_cols)
+        tiles = np.arange(self.n_rows * self.n_cols, dtype=np.int64).reshape(
+            self.n_rows, self.n_cols)
+
+        # Horizontal edges followed by vertical edges, with the flat grid
+        # index of the wall each edge opens, sorted into a random order
+        order = self.rng.permutation(2 * n_cells - self.cell_rows
+                                     - self.cell_cols)
+        first = np.concatenate((cells[:, :-1].ravel(),
+                                cells[:-1, :].ravel()))[order]
+        second = np.concatenate((cells[:, 1:].ravel(),
+                                 cells[1:, :].ravel()))[order]
+        wall = np.concatenate((
+            tiles[1:2 * self.cell_rows:2, 2:2 * self.cell_cols - 1:2].ravel(),
+            tiles[2:2 * self.cell_rows - 1:2, 1:2 * self.cell_cols:2].ravel()
+        ))[order]
+        del order
+
+        grid = self.grid.reshape(-1)
+        while (len(first) > 0):
+            # Earliest edge leaving each component
+            earliest = np.full(n_cells, len(first), dtype=np.int64)
+            edges = np.arange(len(first), dtype=np.int64)
+            np.minimum.at(earliest, first, edges)
+            np.minimum.at(earliest, second, edges)
+            roots = np.flatnonzero(earliest < len(first))
+            chosen = earliest[roots]
+            grid[wall[chosen]] = AIR
+
+            # Point each component at the component across its edge, breaking
+            # the mutual pairs (both components chose the same edge)
+            target = np.where(first[chosen] == roots, second[chosen],
+                              first[chosen])
+            link = np.arange(n_cells, dtype=np.int64)
+            link[roots] = target
+            mutual = (link[target] == roots) & (roots < target)
+            link[roots[mutual]] = roots[mutual]
+            while True:
+                jumped = link[link]
+                if np.array_equal(jumped, link):
+                    break
+                link = jumped
+
+            # Relabel the remaining edges and drop those inside a component
+            first = link[first]
+            second = link[second]
+            keep = first != second
+            first, second, wall = first[keep], second[keep], wall[keep]
+
+        self.place_corners()
+
+    # === Randomised Prim =====================================================
+    def generate_prim(self):
+        """
+        Generate a perfect maze using randomised Prim's algorithm, growing the
+        maze from a single cell by repeatedly connecting a random frontier
+        cell to a random neighbouring cell already in the maze.
+        """
+        self.open_cells()
+        # 0 = not yet reached, 1 = frontier, 2 = in the maze, 3 = not a cell
+        status, pad = self.cell_status(3)
+        buffer = self.buffer
+        randrange = self.random.randrange
+        offsets = (-2, 2, 2 * self.n_cols, -2 * self.n_cols)
+
+        # Positions are padded flat grid indices
+        position = self.n_cols + 1 + pad
+        status[position] = 2
+        frontier = []
+        for offset in offsets:
+            if status[position + offset] == 0:
+                status[position + offset] = 1
+                frontier.append(position + offset)
+
+        while (len(frontier) > 0):
+            # Remove a random frontier cell (swap with the last and pop)
+            i = randrange(len(frontier))
+            position = frontier[i]
+            frontier[i] = frontier[-1]
+            frontier.pop()
+
+            in_maze = []
+            for offset in offsets:
+                neighbour_status = status[position + offset]
+                if neighbour_status == 2:
+                    in_maze.append(offset)
+                elif neighbour_status == 0:
+                    status[position + offset] = 1
+                    frontier.append(position + offset)
+            offset = in_maze[randrange(len(in_maze))]
+            buffer[position + (offset >> 1) - pad] = AIR
+            status[position] = 2
+
+        self.place_corners()
+
+    # === Rooms and Corridors =================================================
+    def generate_rooms(self, max_rooms=None, min_size=3, max_size=15):
+        """
+        Generate a dungeon style layout of rectangular rooms joined by
+        corridors. Each room is joined to the previously placed room by an L
+        shaped corridor, so every room is reachable. The player starts in the
+        first room and the exit is in the last room.
+
+        If fewer than two rooms fit (e.g. on small grids, where one room can
+        fill most of the grid), the layout is started again with smaller
+        rooms, down to single tiles (two of which always fit).
+        :param max_rooms: number of room placements to attempt (defaults to
+                          one per 100 grid tiles, and at least
+                          MIN_ROOM_ATTEMPTS)
+        :param min_size: minimum room width/height
+        :param max_size: maximum room width/height
+        """
+        if max_rooms is None:
+            max_rooms = max(MIN_ROOM_ATTEMPTS,
+                            (self.n_rows * self.n_cols) // 100)
+        assert max_rooms >= 2, \
+            '/!\\ ERROR: At least two room placements must be attempted'
+        max_size = max(1, min(max_size, self.n_rows - 2, self.n_cols - 2))
+        min_size = max(1, min(min_size, max_size))
+
+        while True:
+            centres = self.place_rooms(max_rooms, min_size, max_size)
+            if len(centres) >= 2:
+                break
+            self.grid[:] = SOLID
+            max_size = max(1, max_size - 2)
+            min_size = min(min_size, max_size)
+
+        self.init_row, self.init_col = centres[0]
+        self.exit_row, self.exit_col = centres[-1]
+
+    def place_rooms(self, max_rooms, min_size, max_size):
+        """
+        Attempt to place the given number of rooms at random positions,
+        skipping those which would overlap (or touch) the rooms already
+        placed, and join each room to the previous one.
+        :return: list of room centres, in placement order
+        """
+        centres = []
+        for _ in range(max_rooms):
+            # Rooms and their centres lie on odd coordinates, so corridors
+            # between centres never touch the outer border
+            height = self.random.randrange(min_size, max_size + 1) | 1
+            width = self.random.randrange(min_size, max_size + 1) | 1
+            height = min(height, self.n_rows - 2 - (self.n_rows % 2 == 0))
+            width = min(width, self.n_cols - 2 - (self.n_cols % 2 == 0))
+            top = 2 * self.random.randrange(
+                (self.n_rows - 2 - height) // 2 + 1) + 1
+            left = 2 * self.random.randrange(
+                (self.n_cols - 2 - width) // 2 + 1) + 1
+
+            # Reject rooms overlapping (or touching) existing open space
+            if (self.grid[top - 1:top + height + 1,
+                          left - 1:left + width + 1] != SOLID).any():
+                continue
+            self.grid[top:top + height, left:left + width] = AIR
+
+            centre = (top + (height // 2) | 1, left + (width // 2) | 1)
+            centre = (min(centre[0], top + height - 1),
+                      min(centre[1], left + width - 1))
+            if len(centres) > 0:
+                self.carve_corridor(centres[-1], centre)
+            centres.append(centre)
+        return centres
+
+    def carve_corridor(self, a, b):
+        """
+        Carve an L shaped corridor between the grid positions a and b, turning
+        at a random corner.
+        """
+        (r0, c0), (r1, c1) = a, b
+        if self.random.random() < 0.5:
+            corner = (r0, c1)
+        else:
+            corner = (r1, c0)
+        for (ra, ca), (rb, cb) in ((a, corner), (corner, b)):
+            self.grid[min(ra, rb):max(ra, rb) + 1,
+                      min(ca, cb):max(ca, cb) + 1] = AIR
+
+    # === Optimal Path Cost ===================================================
+    def compute_optimal_cost(self):
+        """
+        Compute the optimal path cost from the player to the exit using
+        Breadth First Search (BFS) over the flat grid. All actions have the
+        same cost, so the number of BFS levels is the optimal cost.
+        :return: optimal path cost
+        """
+        assert len(set(MazeEnv.ACTION_COST.values())) == 1, \
+            '/!\\ ERROR: BFS optimal cost requires uniform action costs'
+        action_cost = MazeEnv.ACTION_COST[MazeEnv.ACTIONS[0]]
+
+        n_cols = self.n_cols
+        start = self.init_row * n_cols + self.init_col
+        goal = self.exit_row * n_cols + self.exit_col
+        if start == goal:
+            return 0
+
+        # The border is solid, so neighbours of open tiles are always in
+        # bounds and lookups need no bounds checks. The NumPy view shares the
+        # bytearray's memory.
+        visited = bytearray(self.buffer)
+        visited_view = np.frombuffer(visited, dtype=np.uint8)
+        visited[start] = SOLID
+        offsets = (-1, 1, n_cols, -n_cols)
+        offset_array = np.array(offsets, dtype=np.int64)
+        # Lattice mazes are searched from cell to cell (two tiles per level),
+        # through the wall tile between the cells
+        step = 2 if self.lattice else 1
+
+        frontier = [start]
+        depth = 0
+        while (len(frontier) > 0):
+            if len(frontier) < BFS_VECTOR_THRESHOLD:
+                # Narrow frontier (e.g. the corridors of a perfect maze)
+                if isinstance(frontier, np.ndarray):
+                    frontier = frontier.tolist()
+                next_frontier = []
+                for index in frontier:
+                    for offset in offsets:
+                        n = index + offset
+                        if visited[n] != SOLID:
+                            visited[n] = SOLID
+                            if step == 2:
+                                n += offset
+                                if visited[n] == SOLID:
+                                    continue
+                                visited[n] = SOLID
+                            next_frontier.append(n)
+            else:
+                # Wide frontier: expand every node at once
+                frontier = np.asarray(frontier, dtype=np.int64)
+                neighbours = (frontier[:, None] + offset_array).ravel()
+                if step == 2:
+                    # Cross the open wall tiles to the cells beyond them
+                    sources = np.repeat(frontier, len(offsets))
+                    crossed = visited_view[neighbours] != SOLID
+                    neighbours = neighbours[crossed]
+                    visited_view[neighbours] = SOLID
+                    neighbours = 2 * neighbours - sources[crossed]
+                next_frontier = np.unique(
+                    neighbours[visited_view[neighbours] != SOLID])
+                visited_view[next_frontier] = SOLID
+            frontier = next_frontier
+            depth += 1
+            if visited[goal] == SOLID:
+                return int(step * depth * action_cost)
+
+        assert False, '/!\\ ERROR: Exit is not reachable from the player'
+
+    # === Output ==============================================================
+    def write(self, f):
+        """
+        Write the maze to the given binary stream in the maze input file
+        format. Rows are written one at a time straight from the grid buffer,
+        so the maze is never held in memory twice.
+        :param f: writable binary file object
+        """
+        assert self.optimal_cost is not None, \
+            '/!\\ ERROR: Maze must be generated before it is written'
+        f.write(f'# num rows, num cols\n{self.n_rows}, {self.n_cols}\n'
+                f'# optimal path cost\n{self.optimal_cost}\n'
+                f'# grid data\n'.encode())
+
+        start = self.init_row * self.n_cols + self.init_col
+        goal = self.exit_row * self.n_cols + self.exit_col
+        self.buffer[start] = PLAYER
+        self.buffer[goal] = EXIT
+        try:
+            for r in range(self.n_rows):
+                f.write(self.grid[r].data)
+                f.write(b'\n')
+        finally:
+            self.buffer[start] = AIR
+            self.buffer[goal] = AIR
+
+
+def main(arglist):
+    if len(arglist) != 4 and len(arglist) != 5:
+        print_usage()
+        return
+
+    algorithm = arglist[0]
+    if algorithm not in MazeGenerator.ALGORITHMS:
+        print("/!\\ ERROR: Invalid algorithm given")
+        print_usage()
+        return
+
+    try:
+        n_rows, n_cols = int(arglist[1]), int(arglist[2])
+        seed = int(arglist[4]) if len(arglist) == 5 else None
+    except ValueError:
+        print("/!\\ ERROR: n_rows, n_cols and seed must be integers")
+        print_usage()
+        return
+
+    t0 = time.time()
+    generator = MazeGenerator(n_rows, n_cols, seed)
+    generator.generate(algorithm)
+    generate_time = time.time() - t0
+
+    if arglist[3] == '-':
+        generator.write(sys.stdout.buffer)
+    else:
+        with open(arglist[3], 'wb') as f:
+            generator.write(f)
+        print(f"Maze generated! \nOptimal path cost: "
+              f"{generator.optimal_cost}\nTime to generate maze: "
+              f"{round(generate_time, 10)} seconds")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,412 @@
+import asyncio
+import copy
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from maze_env import MazeEnv
+from search import Search
+
+"""
+maze_service.py
+
+Long-running asyncio service which solves mazes on request. Parsed maze
+environments (and the search objects built on them) are kept in a
+size-bounded LRU cache so that repeated requests only pay for the search
+itself.
+
+Requests and responses are single-line JSON objects sent over a TCP
+connection (one request per line). A solve request looks like:
+
+    {"maze": "mazes/Maze-1.txt", "algorithm": "a_star"}
+    {"content": "<maze file contents>", "algorithm": "bfs",
+     "start": [3, 1], "goal": [1, 13]}
+
+and a metrics request looks like:
+
+    {"command": "stats"}
+"""
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 32
+# Longest request line accepted (inline maze contents can be large)
+MAX_REQUEST_BYTES = 256 * 1024 * 1024
+# Largest number of start/goal pairs kept for each cached maze
+MAX_SOLVERS_PER_MAZE = 8
+
+# parallel_bfs is not offered: its worker pool would be forked from the
+# executor's threads, which is unsafe, and would compete with the service's
+# own workers for the CPUs
+ALGORITHMS = ['bfs', 'dfs', 'iddfs', 'ucs', 'greedy', 'a_star']
+
+
+def print_usage():
+    print("Usage: python maze_service.py [port (optional)] \
+          [cache_size (optional)]")
+    print(f"    port = TCP port to listen on (default {DEFAULT_PORT})")
+    print(f"    cache_size = maximum number of parsed mazes kept in memory \
+          (default {DEFAULT_CACHE_SIZE})")
+
+
+class MazeCache:
+    """
+    Size-bounded LRU cache of parsed maze environments. Each entry holds the
+    MazeEnv and the Search objects created for it (one per start/goal pair,
+    themselves kept in an LRU of at most MAX_SOLVERS_PER_MAZE), so that
+    derived data such as the heuristic distances is reused between requests.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Return the cache entry for the given key.
+        :param key: hashable maze identifier
+        :return: cache entry (dict with 'env' and 'solvers'), or None if the
+                 maze is not cached
+        """
+        if key not in self.entries:
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def add(self, key, maze_env):
+        """
+        Add a newly loaded maze to the cache (counted as a miss). If the maze
+        was added in the meantime (by another request waiting on the same
+        load), the existing entry is returned and counted as a hit.
+        :param key: hashable maze identifier
+        :param maze_env: MazeEnv
+        :return: cache entry (dict with 'env' and 'solvers')
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        entry = {'env': maze_env, 'solvers': OrderedDict()}
+        self.misses += 1
+        self.entries[key] = entry
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return entry
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+class Metrics:
+    """
+    Request counters and latency samples reported by the 'stats' command.
+    """
+
+    MAX_SAMPLES = 10000
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.latencies = []
+        self.search_times = []
+
+    def record(self, latency, search_time=None):
+        """
+        Record a solved request. search_time is only given by the request
+        which ran the search (not by the requests merged into it), so each
+        search is sampled once.
+        """
+        self.requests += 1
+        self.latencies.append(latency)
+        if search_time is not None:
+            self.search_times.append(search_time)
+        # Only keep the most recent samples
+        for samples in (self.latencies, self.search_times):
+            if len(samples) > self.MAX_SAMPLES:
+                del samples[:len(samples) - self.MAX_SAMPLES]
+
+    @staticmethod
+    def summarise(samples):
+        if len(samples) == 0:
+            return {'mean': 0.0, 'p50': 0.0, 'p95': 0.0, 'max': 0.0}
+        ordered = sorted(samples)
+        return {'mean': sum(ordered) / len(ordered),
+                'p50': ordered[len(ordered) // 2],
+                'p95': ordered[min(len(ordered) - 1,
+                                   int(len(ordered) * 0.95))],
+                'max': ordered[-1]}
+
+
+class MazeService:
+    """
+    Solves maze requests, sharing parsed mazes through a MazeCache, merging
+    identical concurrent requests (and concurrent loads of the same maze) and
+    running the maze parsing and the searches in an executor so the event
+    loop stays responsive.
+
+    The executor is a thread pool rather than a process pool so that the
+    cached MazeEnv and Search objects are used in place: a process pool would
+    have to pickle the maze (and lose the Search objects' derived data) on
+    every request, which for large mazes costs more than the search. The
+    searches are pure Python and hold the GIL, so distinct requests run one
+    at a time (the GIL is still handed back to the event loop regularly, so
+    it keeps accepting and answering requests). Run one service per core to
+    solve distinct mazes in parallel.
+    """
+
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE, max_workers=None):
+        self.cache = MazeCache(cache_size)
+        self.metrics = Metrics()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.in_flight = {}
+        self.loading = {}
+
+    def maze_key(self, request):
+        """
+        Compute the cache key for the maze given in a request. Files are keyed
+        on their path, size and modification time (so edited files are
+        reloaded), and inline content is keyed on its hash.
+        :param request: request dict
+        :return: (key, loader)
+        """
+        if 'content' in request:
+            content = request['content']
+            assert isinstance(content, str), \
+                '/!\\ ERROR: Maze content must be a string'
+            key = ('content', hashlib.sha256(content.encode()).hexdigest())
+            return key, lambda: MazeEnv.from_string(content)
+
+        assert 'maze' in request, '/!\\ ERROR: No maze or content given'
+        assert isinstance(request['maze'], str), \
+            '/!\\ ERROR: Maze filename must be a string'
+        filename = os.path.abspath(request['maze'])
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            assert False, '/!\\ ERROR: Testcase file not found'
+        key = ('file', filename, stat.st_size, stat.st_mtime_ns)
+        return key, lambda: MazeEnv(filename)
+
+    async def load(self, key, loader):
+        """
+        Get the cache entry for a maze, parsing it in the executor if it is
+        not cached. Concurrent requests for the same uncached maze share a
+        single load.
+        :param key: hashable maze identifier
+        :param loader: function returning a new MazeEnv
+        :return: cache entry
+        """
+        entry = self.cache.get(key)
+        if entry is not None:
+            return entry
+
+        if key not in self.loading:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, loader)
+            self.loading[key] = future
+            future.add_done_callback(lambda _: self.loading.pop(key, None))
+        maze_env = await asyncio.shield(self.loading[key])
+        return self.cache.add(key, maze_env)
+
+    def get_solver(self, entry, start, goal):
+        """
+        Get the Search object for the given start and goal positions on a
+        cached maze, creating it if necessary.
+        :param entry: MazeCache entry
+        :param start: (row, col) or None to use the maze's initial position
+        :param goal: (row, col) or None to use the maze's exit position
+        :return: Search
+        """
+        solvers = entry['solvers']
+        if (start, goal) in solvers:
+            solvers.move_to_end((start, goal))
+            return solvers[(start, goal)]
+
+        maze_env = entry['env']
+        if start is not None or goal is not None:
+            # Shallow copy so the (read only) grid data stays shared
+            maze_env = copy.copy(maze_env)
+            for position in (start, goal):
+                if position is None:
+                    continue
+                row, col = position
+                assert 0 <= row < maze_env.n_rows and \
+                    0 <= col < maze_env.n_cols and \
+                    maze_env.grid_data[row][col] != MazeEnv.SOLID_TILE, \
+                    '/!\\ ERROR: Invalid start or goal position'
+            if start is not None:
+                maze_env.init_row, maze_env.init_col = start
+            if goal is not None:
+                maze_env.exit_row, maze_env.exit_col = goal
+
+        solver = Search(maze_env)
+        solvers[(start, goal)] = solver
+        while len(solvers) > MAX_SOLVERS_PER_MAZE:
+            solvers.popitem(last=False)
+        return solver
+
+    @staticmethod
+    def run_search(solver, algorithm):
+        """
+        Run the given search algorithm (called from the executor).
+        :return: (actions, search time in seconds)
+        """
+        t0 = time.perf_counter()
+        actions = getattr(solver, 'search_' + algorithm)()
+        return actions, time.perf_counter() - t0
+
+    async def load_and_search(self, key, loader, start, goal, algorithm):
+        """
+        Load the maze (if it is not cached) and run the search in the
+        executor.
+        :return: (actions, search time in seconds)
+        """
+        entry = await self.load(key, loader)
+        solver = self.get_solver(entry, start, goal)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.run_search,
+                                          solver, algorithm)
+
+    async def solve(self, request):
+        """
+        Solve a single request.
+        :param request: request dict
+        :return: response dict
+        """
+        t0 = time.perf_counter()
+        algorithm = request.get('algorithm', 'a_star')
+        assert algorithm in ALGORITHMS, \
+            '/!\\ ERROR: Invalid search_type given'
+        start = request.get('start')
+        goal = request.get('goal')
+        start = tuple(start) if start is not None else None
+        goal = tuple(goal) if goal is not None else None
+
+        key, loader = self.maze_key(request)
+        request_key = (key, algorithm, start, goal)
+
+        # Merge identical requests which are already being solved
+        coalesced = request_key in self.in_flight
+        if coalesced:
+            self.metrics.coalesced += 1
+            future = self.in_flight[request_key]
+        else:
+            future = asyncio.ensure_future(self.load_and_search(
+                key, loader, start, goal, algorithm))
+            self.in_flight[request_key] = future
+            future.add_done_callback(
+                lambda _: self.in_flight.pop(request_key, None))
+
+        actions, search_time = await asyncio.shield(future)
+        latency = time.perf_counter() - t0
+        self.metrics.record(latency,
+                            search_time if not coalesced else None)
+
+        cost = actions.total_cost(MazeEnv.ACTION_COST)
+        return {'ok': True, 'actions': str(actions), 'cost': cost,
+                'search_time': search_time, 'latency': latency,
+                'coalesced': coalesced}
+
+    def stats(self):
+        """
+        Report the service's cache and latency metrics.
+        :return: response dict
+        """
+        return {'ok': True,
+                'requests': self.metrics.requests,
+                'errors': self.metrics.errors,
+                'coalesced': self.metrics.coalesced,
+                'cache_size': len(self.cache.entries),
+                'cache_hits': self.cache.hits,
+                'cache_misses': self.cache.misses,
+                'cache_hit_rate': self.cache.hit_rate(),
+                'latency': Metrics.summarise(self.metrics.latencies),
+                'search_time': Metrics.summarise(self.metrics.search_times)}
+
+    async def handle_request(self, request):
+        try:
+            if request.get('command') == 'stats':
+                return self.stats()
+            return await self.solve(request)
+        except (AssertionError, IndexError, KeyError, OSError, TypeError,
+                ValueError) as e:
+            self.metrics.errors += 1
+            return {'ok': False, 'error': str(e)}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve newline delimited JSON requests on a single connection.
+        """
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The request is longer than MAX_REQUEST_BYTES; the rest
+                    # of it cannot be told apart from the next request, so
+                    # the connection is closed after the error is sent
+                    self.metrics.errors += 1
+                    response = {'ok': False,
+                                'error': '/!\\ ERROR: Request too long'}
+                    writer.write(json.dumps(response).encode() + b'\n')
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    assert isinstance(request, dict), \
+                        '/!\\ ERROR: Request must be a JSON object'
+                except (AssertionError, ValueError) as e:
+                    self.metrics.errors += 1
+                    response = {'ok': False, 'error': str(e)}
+                else:
+                    response = await self.handle_request(request)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle_connection, host,
+                                            port, limit=MAX_REQUEST_BYTES)
+        print(f"Maze service listening on {host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(arglist):
+    if len(arglist) > 2:
+        print_usage()
+        return
+    try:
+        port = int(arglist[0]) if len(arglist) > 0 else DEFAULT_PORT
+        cache_size = int(arglist[1]) if len(arglist) > 1 \
+            else DEFAULT_CACHE_SIZE
+    except ValueError:
+        print("/!\\ ERROR: port and cache_size must be integers")
+        print_usage()
+        return
+
+    service = MazeService(cache_size)
+    try:
+        asyncio.run(service.serve(port=port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.executor.shutdown(wait=False)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,9 +1,11 @@
+import os
 import sys
 import time
 
 from maze_env import MazeEnv
 from maze_state import MazeState
 from search import Search
+from solution_cache import SolutionCache
 
 """
 maze_solver.py
@@ -16,23 +18,81 @@ VISUALISE_TIME_END = 5.0
 
 def print_usage():
     print("Usage: python tester.py [search_type] [testcase_file] \
-          [-v (optional)]")
+          [-v (optional)] [-o output_file (optional)] \
+          [--no-cache (optional)] [--clear-cache (optional)]")
     print("    search_type = 'bfs' or 'dfs' or 'iddfs' or 'ucs' or 'greedy' \
-          or 'a_star'")
+          or 'a_star' or 'parallel_bfs'")
     print("    testcase_file = filename of a valid testcase file \
           (e.g. L1.txt)")
     print("    if -v is specified, the solver's trajectory will be visualised")
+    print("    if -o is specified, the solution is written to output_file \
+          ('-' for stdout)")
+    print("    if --no-cache is specified, the solution cache is not used")
+    print("    if --clear-cache is specified, the solution cache is cleared \
+          before solving")
+
+
+def run_search(maze_env, search_type):
+    """
+    Run the chosen search on the given maze.
+    :param maze_env: MazeEnv
+    :param search_type: name of the search algorithm (e.g. 'bfs')
+    :return: (actions, time taken in seconds)
+    """
+    t0 = time.time()
+    solver = Search(maze_env)
+    if search_type == 'bfs':
+        actions = solver.search_bfs()
+    elif search_type == 'dfs':
+        actions = solver.search_dfs()
+    elif search_type == 'iddfs':
+        actions = solver.search_iddfs()
+    elif search_type == 'ucs':
+        actions = solver.search_ucs()
+    elif search_type == 'greedy':
+        actions = solver.search_greedy()
+    elif search_type == 'parallel_bfs':
+        actions = solver.search_parallel_bfs()
+    else:
+        actions = solver.search_a_star()
+    run_time = (time.time() - t0)
+    return actions, run_time
 
 
 def main(arglist):
+    # run_solver() may redirect status messages to stderr (see -o)
+    stdout = sys.stdout
+    try:
+        run_solver(arglist)
+    finally:
+        sys.stdout = stdout
+
+
+def write_solution(actions, f):
+    """
+    Write the solution to the given stream, stopping quietly if the stream is
+    a pipe which has been closed by its reader (e.g. piped into head).
+    """
+    try:
+        actions.write(f)
+        f.flush()
+    except BrokenPipeError:
+        # Discard anything still buffered for the closed pipe
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, f.fileno())
+        os.close(devnull)
+
+
+def run_solver(arglist):
     # Check if there is the correct number of arguments
-    if len(arglist) != 2 and len(arglist) != 3:
+    if len(arglist) < 2:
         print_usage()
         return
     
     # Check search type
     search_type = arglist[0]
-    if search_type not in ['bfs', 'dfs', 'iddfs', 'ucs', 'greedy', 'a_star']:
+    if search_type not in ['bfs', 'dfs', 'iddfs', 'ucs', 'greedy', 'a_star',
+                           'parallel_bfs']:
         print("/!\\ ERROR: Invalid search_type given")
         print_usage()
         return
@@ -41,34 +101,65 @@ def main(arglist):
     testcase_file = arglist[1]
     maze_env = MazeEnv(testcase_file)
 
-    # Check if visualisation mode is activated
-    if len(arglist) == 3:
-        if arglist[2] == '-v':
+    # Check which options are activated
+    visualise = False
+    use_cache = True
+    clear_cache = False
+    output_file = None
+    options = iter(arglist[2:])
+    for option in options:
+        if option == '-v':
             visualise = True
+        elif option == '-o':
+            output_file = next(options, None)
+            if output_file is None:
+                print("/!\\ ERROR: No output_file given for -o")
+                print_usage()
+                return
+        elif option == '--no-cache':
+            use_cache = False
+        elif option == '--clear-cache':
+            clear_cache = True
         else:
-            print(f"/!\\ ERROR: Invalid option given: {arglist[2]}")
+            print(f"/!\\ ERROR: Invalid option given: {option}")
             print_usage()
             return
-    else:
-        visualise = False
 
-    # Run the search chosen on the selected maze
+    # When the solution is written to stdout, stdout carries the solution
+    # only and status messages are printed to stderr
+    solution_stream = sys.stdout
+    if output_file == '-':
+        sys.stdout = sys.stderr
+
+    cache = SolutionCache()
+    if clear_cache:
+        cache.clear()
+
+    # Check for a cached solution to the selected maze
     actions = None
+    cached = None
     t0 = time.time()
-    solver = Search(maze_env)
-    if search_type == 'bfs':
-        actions = solver.search_bfs()
-    elif search_type == 'dfs':
-        actions = solver.search_dfs()
-    elif search_type == 'iddfs':
-        actions = solver.search_iddfs()
-    elif search_type == 'ucs':
-        actions = solver.search_ucs()
-    elif search_type == 'greedy ':
-        actions = solver.search_greedy()
+    if use_cache:
+        cached = cache.get(maze_env, search_type)
+
+    if cached is not None:
+        actions = cached[0]
+        run_time = (time.time() - t0)
+        print(f"Solution loaded from cache (original search time: \
+              {round(cached[1]['search_time'], 10)} seconds)")
     else:
-        actions = solver.search_a_star()
-    run_time = (time.time() - t0)
+        actions, run_time = run_search(maze_env, search_type)
+        if use_cache:
+            cache.put(maze_env, search_type, actions,
+                      {'search_time': run_time, 'num_actions': len(actions),
+                       'cost': actions.total_cost(maze_env.ACTION_COST)})
+
+    # Write the solution (in chunks of actions)
+    if output_file == '-':
+        write_solution(actions, solution_stream)
+    elif output_file is not None:
+        with open(output_file, 'w') as f:
+            actions.write(f)
 
     # Evaluate the solution
     control_env = MazeEnv(testcase_file)
@@ -91,8 +182,7 @@ def main(arglist):
     time.sleep(VISUALISE_TIME_PER_STEP)
     cost = 0
 
-    for i in range(len(actions)): # For each action in the solution
-        a = actions[i]
+    for i, a in enumerate(actions): # For each action in the solution
         cost += 1
         try:
             total_cost += maze_env.ACTION_COST[a]
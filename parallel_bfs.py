@@ -0,0 +1,400 @@
+import atexit
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from action_path import ActionPath
+from maze_env import MazeEnv
+
+"""
+parallel_bfs.py
+
+This file contains a parallel, level-synchronous Breadth First Search (BFS)
+which shares the maze between a pool of worker processes using shared memory.
+"""
+
+# Largest number of frontier nodes expanded between two barriers
+CHUNK_SIZE = 1 << 20
+
+# Frontiers smaller than this are expanded in the main process, one node at
+# a time below SERIAL_THRESHOLD and with NumPy below PARALLEL_THRESHOLD
+SERIAL_THRESHOLD = 64
+PARALLEL_THRESHOLD = 4096
+
+# Smallest number of frontier nodes handed to a single worker
+MIN_SHARD_SIZE = 1024
+
+# Value of an unvisited position in the shared parent array (visited
+# positions store the index in MazeEnv.ACTIONS of the action used to reach
+# them, and the start stores START)
+UNVISITED = -1
+START = len(MazeEnv.ACTIONS)
+
+# Row and column moves of each action, in the order of MazeEnv.ACTIONS
+MOVES = {MazeEnv.LEFT: (0, -1), MazeEnv.RIGHT: (0, 1), MazeEnv.DOWN: (1, 0),
+         MazeEnv.UP: (-1, 0)}
+
+# Worker pool shared by every search in this process, created on first use
+_pool = {}
+
+# Shared memory arrays attached in each worker process
+_worker = {}
+
+
+def get_pool(processes):
+    """
+    Get the process-wide worker pool, creating it (or replacing it if it has
+    a different number of workers) if necessary. The pool is kept for the
+    lifetime of the process, so its start up cost is only paid once.
+    :param processes: number of worker processes
+    :return: multiprocessing.Pool
+    """
+    if _pool.get('processes') != processes:
+        close_pool()
+        # Workers forked after the resource tracker has started share it, so
+        # they do not report the blocks they attach to as leaked on exit
+        resource_tracker.ensure_running()
+        _pool['pool'] = multiprocessing.Pool(
+            processes, initializer=_init_worker,
+            initargs=(multiprocessing.Barrier(processes),))
+        _pool['processes'] = processes
+    return _pool['pool']
+
+
+def close_pool():
+    """
+    Terminate the process-wide worker pool (if there is one).
+    """
+    pool = _pool.pop('pool', None)
+    _pool.pop('processes', None)
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+
+
+atexit.register(close_pool)
+
+
+def _init_worker(barrier):
+    """
+    Pool initializer: keep the barrier used to hand one detach task to each
+    worker.
+    """
+    _worker['barrier'] = barrier
+
+
+def _release():
+    """
+    Unmap the shared memory blocks a worker process is attached to (if any).
+    """
+    _worker.pop('names', None)
+    _worker.pop('arrays', None)
+    for block in _worker.pop('blocks', []):
+        block.close()
+
+
+def _detach(_):
+    """
+    Release a worker's shared memory blocks at the end of a search, then wait
+    for the other workers, so that every worker runs exactly one detach task.
+    """
+    _release()
+    _worker['barrier'].wait()
+
+
+def _attach(names, layout):
+    """
+    Attach a worker process to the shared memory blocks of a search, reusing
+    the attachment made for a previous task of the same search.
+    :return: shared arrays (see ParallelBFS.shared_arrays)
+    """
+    if _worker.get('names') != names:
+        _release()
+        _worker['names'] = names
+        _worker['blocks'] = [shared_memory.SharedMemory(name=name)
+                             for name in names]
+        _worker['arrays'] = ParallelBFS.shared_arrays(_worker['blocks'],
+                                                      layout)
+    return _worker['arrays']
+
+
+def _run(task):
+    """
+    Run one step of a level (expand, claim or compact) in a worker process.
+    :param task: (function, shared memory block names, layout, arguments)
+    """
+    function, names, layout, args = task
+    return function(_attach(names, layout), layout, *args)
+
+
+def expand(arrays, layout, first, start, end):
+    """
+    Expand the frontier nodes queue[first + start:first + end]. For each node
+    and each action (in MazeEnv.ACTIONS order), the reachable unvisited
+    neighbour is written to candidates[4 * i + action] (or -1 if there is
+    none), so that reading the candidates in order gives the order in which a
+    sequential BFS would discover them.
+    :param arrays: shared arrays
+    :param layout: (n_rows, n_cols, chunk_size)
+    :param first: index in the queue of the first node of the chunk
+    :param start: index in the chunk of the first node to expand
+    :param end: index in the chunk after the last node to expand
+    """
+    walls, parent, queue, candidates, _ = arrays
+    n_rows, n_cols, _ = layout
+    nodes = queue[first + start:first + end]
+    rows = nodes // n_cols
+    cols = nodes - rows * n_cols
+    out = candidates[4 * start:4 * end].reshape(-1, 4)
+
+    for a, action in enumerate(MazeEnv.ACTIONS):
+        dr, dc = MOVES[action]
+        valid = (rows + dr >= 0) & (rows + dr < n_rows) \
+            & (cols + dc >= 0) & (cols + dc < n_cols)
+        neighbours = np.where(valid, nodes + dr * n_cols + dc, 0)
+        valid &= (walls[neighbours] == 0) & (parent[neighbours] == UNVISITED)
+        out[:, a] = np.where(valid, neighbours, -1)
+
+
+def claim(arrays, layout, n, owner, n_owners, shard_ends):
+    """
+    Claim the positions discovered by the n nodes of a chunk which belong to
+    the given owner (those congruent to owner modulo n_owners). Each position
+    goes to its first candidate slot, i.e. (frontier, action) order: the
+    action is recorded in the parent array and the slot is marked in keep.
+    Distinct owners never touch the same position, so no locking is needed.
+    :param n: number of nodes in the chunk
+    :param owner: index of this owner
+    :param n_owners: number of owners
+    :param shard_ends: end of each frontier shard (in candidate slots)
+    :return: number of claimed slots in each frontier shard
+    """
+    _, parent, _, candidates, keep = arrays
+    found = candidates[:4 * n]
+    slots = np.flatnonzero((found >= 0) & (found % n_owners == owner))
+    positions = found[slots]
+    positions, first = np.unique(positions, return_index=True)
+    slots = slots[first]
+    parent[positions] = slots % 4
+    keep[slots] = 1
+    return np.bincount(np.searchsorted(shard_ends, slots, side='right'),
+                       minlength=len(shard_ends))
+
+
+def compact(arrays, layout, start, end, offset):
+    """
+    Append the positions claimed from the candidates of chunk nodes
+    [start, end) to the queue, in discovery order, starting at offset.
+    """
+    _, _, queue, candidates, keep = arrays
+    kept = keep[4 * start:4 * end].view(bool)
+    positions = candidates[4 * start:4 * end][kept]
+    queue[offset:offset + len(positions)] = positions
+    kept[:] = False
+
+
+class ParallelBFS:
+    """
+    Level-synchronous BFS over the maze grid. The wall mask, the parent
+    (visited) array, the BFS queue and the expansion results all live in
+    shared memory, and each level of the queue is processed by a pool of
+    worker processes in three steps:
+
+    - expand: each worker expands a contiguous shard of the frontier and
+      writes the unvisited neighbours of its nodes to the candidate slots;
+    - claim: each worker owns an interleaved range of positions, and claims
+      each of them for its first candidate slot (in (frontier, action) order,
+      which is the order a sequential BFS discovers them in);
+    - compact: each worker appends the claimed candidates of its frontier
+      shard to the queue, at an offset given by a prefix sum over the number
+      of claims in each shard.
+
+    Only shard bounds and counts are exchanged with the workers, and the
+    path found is exactly the one returned by a sequential BFS.
+    """
+
+    def __init__(self, maze_env, processes=None):
+        self.maze_env = maze_env
+        self.processes = processes if processes is not None \
+            else multiprocessing.cpu_count()
+
+    @staticmethod
+    def shared_arrays(blocks, layout):
+        """
+        View the shared memory blocks as (walls, parent, queue, candidates,
+        keep) arrays.
+        :param layout: (n_rows, n_cols, chunk_size)
+        """
+        n_rows, n_cols, chunk_size = layout
+        n_tiles = n_rows * n_cols
+        walls = np.ndarray(n_tiles, dtype=np.uint8, buffer=blocks[0].buf)
+        parent = np.ndarray(n_tiles, dtype=np.int8, buffer=blocks[1].buf)
+        queue = np.ndarray(n_tiles, dtype=np.int32, buffer=blocks[2].buf)
+        candidates = np.ndarray(4 * chunk_size, dtype=np.int32,
+                                buffer=blocks[3].buf)
+        keep = np.ndarray(4 * chunk_size, dtype=np.uint8,
+                          buffer=blocks[4].buf)
+        return walls, parent, queue, candidates, keep
+
+    def search(self):
+        """
+        Find a path which solves the environment using parallel BFS.
+        :return: path (ActionPath of actions, where each action is an
+                 element of MazeEnv.ACTIONS)
+        """
+        maze_env = self.maze_env
+        n_rows, n_cols = maze_env.n_rows, maze_env.n_cols
+        n_tiles = n_rows * n_cols
+        assert n_tiles < 2 ** 31, '/!\\ ERROR: Maze too large for parallel BFS'
+        layout = (n_rows, n_cols, CHUNK_SIZE)
+        sizes = (n_tiles, n_tiles, 4 * n_tiles, 16 * CHUNK_SIZE,
+                 4 * CHUNK_SIZE)
+        # Start the worker pool before the blocks are mapped (if the maze is
+        # large enough to need it), so that forked workers do not inherit
+        # mappings of this search which they could never release
+        if self.processes >= 2 and n_tiles >= PARALLEL_THRESHOLD:
+            get_pool(self.processes)
+        blocks = []
+        self.attached = False
+        try:
+            for size in sizes:
+                blocks.append(shared_memory.SharedMemory(create=True,
+                                                         size=size))
+            arrays = self.shared_arrays(blocks, layout)
+            walls, parent, queue, candidates, keep = arrays
+            walls[:] = np.frombuffer(
+                ''.join(''.join(row) for row in maze_env.grid_data).encode(),
+                dtype=np.uint8) == ord(MazeEnv.SOLID_TILE)
+            parent[:] = UNVISITED
+            keep[:] = 0
+
+            start = maze_env.init_row * n_cols + maze_env.init_col
+            goal = maze_env.exit_row * n_cols + maze_env.exit_col
+            parent[start] = START
+            queue[0] = start
+
+            # The current level is queue[head:tail]
+            head, tail = 0, 1
+            while (head < tail and parent[goal] == UNVISITED):
+                if tail - head < SERIAL_THRESHOLD:
+                    next_tail = self.expand_serial(blocks, queue, head, tail)
+                else:
+                    next_tail = tail
+                    for first in range(head, tail, CHUNK_SIZE):
+                        n = min(tail, first + CHUNK_SIZE) - first
+                        next_tail = self.expand_chunk(blocks, arrays, layout,
+                                                      first, n, next_tail)
+                head, tail = tail, next_tail
+
+            if parent[goal] == UNVISITED:
+                return ActionPath()
+            return self.extract_path(parent, goal)
+        finally:
+            if self.attached:
+                # The workers outlive the search, so they must unmap the
+                # blocks for their memory to be freed once unlinked
+                self.detach_workers()
+            # Release the views of the blocks so that they can be closed
+            arrays = walls = parent = queue = candidates = keep = None
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def expand_chunk(self, blocks, arrays, layout, first, n, tail):
+        """
+        Expand the n frontier nodes starting at queue[first], in the main
+        process for small chunks and over the worker pool otherwise.
+        :param tail: index in the queue at which to append the new positions
+        :return: index in the queue after the last new position
+        """
+        if n < PARALLEL_THRESHOLD or self.processes < 2:
+            expand(arrays, layout, first, 0, n)
+            claim(arrays, layout, n, 0, 1, [4 * n])
+            count = int(np.count_nonzero(arrays[4][:4 * n]))
+            compact(arrays, layout, 0, n, tail)
+            return tail + count
+
+        pool = get_pool(self.processes)
+        self.attached = True
+        names = tuple(block.name for block in blocks)
+        shards = self.shards(n)
+        shard_ends = [4 * end for _, end in shards]
+
+        pool.map(_run, [(expand, names, layout, (first, start, end))
+                        for start, end in shards])
+        counts = sum(pool.map(_run, [(claim, names, layout,
+                                      (n, owner, self.processes, shard_ends))
+                                     for owner in range(self.processes)]))
+        # Each shard's new positions go after those of the previous shards
+        offsets = tail + np.concatenate(([0], np.cumsum(counts)))
+        pool.map(_run, [(compact, names, layout,
+                         (start, end, int(offsets[i])))
+                        for i, (start, end) in enumerate(shards)])
+        return int(offsets[-1])
+
+    def detach_workers(self):
+        """
+        Make every worker process unmap the current search's shared memory.
+        """
+        pool = get_pool(self.processes)
+        pool.map(_detach, range(self.processes), chunksize=1)
+
+    def expand_serial(self, blocks, queue, head, tail):
+        """
+        Expand a small frontier one node at a time in the main process
+        (avoiding the per-call overhead of NumPy on tiny frontiers).
+        :param blocks: shared memory blocks
+        :param queue: shared BFS queue
+        :param head: index in the queue of the first frontier node
+        :param tail: index in the queue after the last frontier node
+        :return: index in the queue after the last new position
+        """
+        n_rows, n_cols = self.maze_env.n_rows, self.maze_env.n_cols
+        moves = [(a, MOVES[action][0], MOVES[action][1],
+                  MOVES[action][0] * n_cols + MOVES[action][1])
+                 for a, action in enumerate(MazeEnv.ACTIONS)]
+        walls = blocks[0].buf
+        parent = blocks[1].buf.cast('b')
+        try:
+            found = []
+            for position in queue[head:tail].tolist():
+                row, col = divmod(position, n_cols)
+                for a, dr, dc, step in moves:
+                    if 0 <= row + dr < n_rows and 0 <= col + dc < n_cols:
+                        neighbour = position + step
+                        if not walls[neighbour] \
+                           and parent[neighbour] == UNVISITED:
+                            parent[neighbour] = a
+                            found.append(neighbour)
+            queue[tail:tail + len(found)] = found
+            return tail + len(found)
+        finally:
+            parent.release()
+
+    def shards(self, n):
+        """
+        Split n frontier nodes into contiguous shards, one per worker (or
+        fewer if the shards would be smaller than MIN_SHARD_SIZE).
+        :return: list of (start, end) bounds
+        """
+        n_shards = max(1, min(self.processes, n // MIN_SHARD_SIZE))
+        bounds = np.linspace(0, n, n_shards + 1).astype(np.int64).tolist()
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def extract_path(self, parent, goal):
+        """
+        Build the path to the goal by following the parent array back to the
+        start.
+        :return: path (ActionPath)
+        """
+        n_cols = self.maze_env.n_cols
+        steps = [MOVES[action][0] * n_cols + MOVES[action][1]
+                 for action in MazeEnv.ACTIONS]
+        def actions(position):
+            while (parent[position] != START):
+                a = int(parent[position])
+                yield MazeEnv.ACTIONS[a]
+                position -= steps[a]
+
+        return ActionPath.from_reversed(actions(goal))
@@ -1,3 +1,4 @@
+from action_path import ActionPath
 from maze_env import MazeEnv
 from maze_state import MazeState
 from queue import PriorityQueue
@@ -70,13 +71,30 @@ class Search:
         self.end_position = (self.maze_env.exit_row, self.maze_env.exit_col)
 
 
+    # === Solution Path =======================================================
+    def extract_path(self, node):
+        """
+        Build the path of actions taken to reach the given node, following
+        the parent nodes back to the start. The path is packed one byte per
+        action as it is built, so long solutions are never held as a list of
+        single actions.
+        :param node: ContainerEntry for a solved state
+        :return: path (ActionPath)
+        """
+        def actions(node):
+            while (node.action is not None):
+                yield node.action
+                node = node.parent
+
+        return ActionPath.from_reversed(actions(node))
+
     # === Breadth First Search ================================================
     def search_bfs(self):
         """
         Find a path which solves the environment using Breadth First Search 
         (BFS).
-        :return: path (list of actions, where each action is an element of 
-                 MazeEnv.ACTIONS)
+        :return: path (ActionPath of actions, where each action is an 
+                 element of MazeEnv.ACTIONS)
         """
 
         start = ContainerEntry(self.maze_env.get_init_state(), 0, None, 0, 
@@ -87,12 +105,7 @@ class Search:
         while (len(container) > 0):
             node = container.pop(0)
             if (self.maze_env.is_solved(node.state)):
-                actions = []
-                while (node.action is not None):
-                    actions.append(node.action)
-                    node = node.parent
-                actions.reverse()
-                return actions
+                return self.extract_path(node)
             else:
                 successors = node.get_successors()
                 for successor in successors:
@@ -100,15 +113,29 @@ class Search:
                         visited.add(successor.state)
                         container.append(successor)
 
-        return []
+        return ActionPath()
     
+    # === Parallel Breadth First Search =======================================
+    def search_parallel_bfs(self, processes=None):
+        """
+        Find a path which solves the environment using a parallel, level 
+        synchronous Breadth First Search over a pool of worker processes 
+        (see parallel_bfs.py). Returns the same path as search_bfs().
+        :param processes: number of worker processes (defaults to the number 
+                          of CPUs)
+        :return: path (ActionPath of actions, where each action is an 
+                 element of MazeEnv.ACTIONS)
+        """
+        from parallel_bfs import ParallelBFS
+        return ParallelBFS(self.maze_env, processes).search()
+
     # === Depth First Search ==================================================
     def search_dfs(self):
         """
         Find a path which solves the environment using Depth First Search
         (DFS).
-        :return: path (list of actions, where each action is an element of 
-                 MazeEnv.ACTIONS)
+        :return: path (ActionPath of actions, where each action is an 
+                 element of MazeEnv.ACTIONS)
         """
 
         start = ContainerEntry(self.maze_env.get_init_state(), 0, None, 0, 
@@ -119,12 +146,7 @@ class Search:
         while (len(container) > 0):
             node = container.pop(-1)
             if (self.maze_env.is_solved(node.state)):
-                actions = []
-                while (node.action is not None):
-                    actions.append(node.action)
-                    node = node.parent
-                actions.reverse()
-                return actions
+                return self.extract_path(node)
             else:
                 successors = node.get_successors()
                 for successor in successors:
@@ -132,15 +154,15 @@ class Search:
                         visited.add(successor.state)
                         container.append(successor)
 
-        return []
+        return ActionPath()
     
     # === Iterative Deepening Depth First Search ==============================
     def search_iddfs(self):
         """
         Find a path which solves the environment using Iterative Deepening 
         Depth First Search (IDDFS).
-        :return: path (list of actions, where each action is an element of 
-                 MazeEnv.ACTIONS)
+        :return: path (ActionPath of actions, where each action is an 
+                 element of MazeEnv.ACTIONS)
         """
 
         start = ContainerEntry(self.maze_env.get_init_state(), 0, None, 0,
@@ -154,12 +176,7 @@ class Search:
                 if node.num_actions > depth:
                     continue
                 elif (self.maze_env.is_solved(node.state)):
-                    actions = []
-                    while (node.action is not None):
-                        actions.append(node.action)
-                        node = node.parent
-                    actions.reverse()
-                    return actions
+                    return self.extract_path(node)
                 else:
                     successors = node.get_successors()
                     for successor in successors:
@@ -168,15 +185,15 @@ class Search:
                             visited[successor.state] = successor.cost
                             container.append(successor)
 
-        return []
+        return ActionPath()
 
     # === Uniform Cost Search =================================================
     def search_ucs(self):
         """
         Find a path which solves the environment using Uniform Cost Search 
         (UCS).
-        :return: path (list of actions, where each action is an element of 
-                 MazeEnv.ACTIONS)
+        :return: path (ActionPath of actions, where each action is an 
+                 element of MazeEnv.ACTIONS)
         """
 
         start = ContainerEntry(self.maze_env.get_init_state(), 0, None, 0, 
@@ -188,12 +205,7 @@ class Search:
         while (container.qsize() > 0):
             node = container.get()[1]
             if (self.maze_env.is_solved(node.state)):
-                actions = []
-                while (node.action is not None):
-                    actions.append(node.action)
-                    node = node.parent
-                actions.reverse()
-                return actions
+                return self.extract_path(node)
             else:
                 successors = node.get_successors()
                 for successor in successors:
@@ -202,15 +214,15 @@ class Search:
                         visited[successor.state] = successor.cost
                         container.put((successor.cost, successor))
 
-        return []
+        return ActionPath()
     
     # === Greedy Best First Search ============================================
     def search_greedy(self):
         """
         Find a path which solves the environment using Greedy Best First 
         Search (Greedy). 
-        :return: path (list of actions, where each action is an element of 
-                 MazeEnv.ACTIONS)
+        :return: path (ActionPath of actions, where each action is an 
+                 element of MazeEnv.ACTIONS)
         """
 
         start = ContainerEntry(self.maze_env.get_init_state(), 0, None, 0, 
@@ -222,12 +234,7 @@ class Search:
         while (container.qsize() > 0):
             node = container.get()[1]
             if (self.maze_env.is_solved(node.state)):
-                actions = []
-                while (node.action is not None):
-                    actions.append(node.action)
-                    node = node.parent
-                actions.reverse()
-                return actions
+                return self.extract_path(node)
             else:
                 successors = node.get_successors()
                 for successor in successors:
@@ -237,14 +244,14 @@ class Search:
                         container.put((self.compute_heuristic(successor.state),
                                        successor))
 
-        return []
+        return ActionPath()
 
     # === A* Search ===========================================================
     def search_a_star(self):
         """
         Find a path which solves the environment using A* Search.
-        :return: path (list of actions, where each action is an element of 
-                 MazeEnv.ACTIONS)
+        :return: path (ActionPath of actions, where each action is an 
+                 element of MazeEnv.ACTIONS)
         """
 
         start = ContainerEntry(self.maze_env.get_init_state(), 0, None, 0, 
@@ -256,12 +263,7 @@ class Search:
         while (container.qsize() > 0):
             node = container.get()[1]
             if (self.maze_env.is_solved(node.state)):
-                actions = []
-                while (node.action is not None):
-                    actions.append(node.action)
-                    node = node.parent
-                actions.reverse()
-                return actions
+                return self.extract_path(node)
             else:
                 successors = node.get_successors()
                 for successor in successors:
@@ -271,7 +273,7 @@ class Search:
                         container.put((self.compute_heuristic(successor.state) 
                                        + successor.cost, successor))
 
-        return []
+        return ActionPath()
     
     # === Informed Search Heuristic ===========================================
     def compute_heuristic(self, state):
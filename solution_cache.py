@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import sys
+
+from action_path import ActionPath
+from maze_env import MazeEnv
+
+"""
+solution_cache.py
+
+This file contains a content-addressed, persistent cache of maze solutions,
+so that solving the same maze with the same search algorithm again does not
+need to repeat the search.
+"""
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache',
+                                 'maze_solver')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Mixed into every key, so that entries written by older versions (whose
+# 'greedy' entries were produced by A*) are never read
+KEY_VERSION = 2
+
+
+class SolutionCache:
+    """
+    Solutions stored on local disk, one file per entry, keyed by a hash of
+    the parsed maze grid, the start and exit positions and the search
+    algorithm. Each entry stores the actions (as a string of action symbols)
+    and the search stats.
+
+    The cache is kept under max_bytes by evicting the least recently used
+    entries (entry modification times are updated on every hit).
+
+    The cache is best effort: entries which cannot be read or parsed count as
+    misses, and failures to write to the cache directory print a warning
+    rather than raising.
+    """
+
+    SUFFIX = '.json'
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(maze_env, algorithm):
+        """
+        Compute the cache key for solving the given maze with the given
+        algorithm.
+        :param maze_env: MazeEnv
+        :param algorithm: search algorithm name (e.g. 'bfs')
+        :return: hex digest
+        """
+        h = hashlib.sha256()
+        h.update(f'{KEY_VERSION}\n{algorithm}\n{maze_env.n_rows},{maze_env.n_cols}\n'
+                 f'{maze_env.init_row},{maze_env.init_col}\n'
+                 f'{maze_env.exit_row},{maze_env.exit_col}\n'.encode())
+        for row in maze_env.grid_data:
+            h.update(''.join(row).encode())
+            h.update(b'\n')
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    @staticmethod
+    def is_valid(maze_env, actions):
+        """
+        Check that the given actions solve the maze without collisions.
+        :param maze_env: MazeEnv
+        :param actions: iterable of actions
+        :return: True if the actions solve the maze, False otherwise
+        """
+        state = maze_env.get_init_state()
+        for action in actions:
+            success, state = maze_env.perform_action(state, action)
+            if not success:
+                return False
+        return maze_env.is_solved(state)
+
+    def get(self, maze_env, algorithm):
+        """
+        Look up the solution for the given maze and algorithm. The stored
+        actions are replayed through the maze before they are returned, and
+        entries which no longer solve the maze are removed.
+        :param maze_env: MazeEnv
+        :param algorithm: search algorithm name
+        :return: (actions [ActionPath], stats) or None if there is no valid
+                 cached entry
+        """
+        filename = self.path(self.key(maze_env, algorithm))
+        try:
+            with open(filename, 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        actions, stats = self.parse_entry(entry)
+        if actions is None or not self.is_valid(maze_env, actions):
+            self.remove(filename)
+            return None
+
+        try: # Mark the entry as recently used
+            os.utime(filename)
+        except OSError:
+            pass
+        return actions, stats
+
+    @staticmethod
+    def parse_entry(entry):
+        """
+        Check the structure of a cache entry read from disk: the actions must
+        be a string of action symbols, and the stats must include the search
+        time and only hold numbers.
+        :param entry: decoded JSON entry
+        :return: (actions [ActionPath], stats), or (None, None) if the entry
+                 is malformed
+        """
+        if not isinstance(entry, dict) \
+           or not isinstance(entry.get('actions'), str) \
+           or not isinstance(entry.get('stats'), dict):
+            return None, None
+        actions, stats = entry['actions'], entry['stats']
+        if not set(actions) <= set(MazeEnv.ACTIONS) \
+           or 'search_time' not in stats \
+           or not all(isinstance(value, (int, float))
+                      and not isinstance(value, bool)
+                      for value in stats.values()):
+            return None, None
+        return ActionPath.from_actions(actions), stats
+
+    @staticmethod
+    def warn(message, error):
+        print(f"/!\\ WARNING: {message} ({error})", file=sys.stderr)
+
+    def put(self, maze_env, algorithm, actions, stats):
+        """
+        Store the solution for the given maze and algorithm, then evict least
+        recently used entries if the cache is over its size limit.
+        :param maze_env: MazeEnv
+        :param algorithm: search algorithm name
+        :param actions: ActionPath
+        :param stats: dict of numeric search stats (including 'search_time')
+        """
+        filename = self.path(self.key(maze_env, algorithm))
+        # Write to a temporary file and rename, so that readers never see a
+        # partially written entry
+        temp_filename = f'{filename}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_filename, 'w') as f:
+                json.dump({'actions': str(actions), 'stats': stats}, f)
+            os.replace(temp_filename, filename)
+        except OSError as e:
+            self.warn('Could not write to the solution cache', e)
+            self.remove(temp_filename)
+            return
+        self.evict()
+
+    def entries(self):
+        """
+        List the cache entries.
+        :return: list of (modification time, size, filename)
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+
+        entries = []
+        for name in names:
+            if not name.endswith(self.SUFFIX):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, filename))
+        return entries
+
+    def evict(self):
+        """
+        Remove the least recently used entries until the cache is within its
+        size limit.
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in entries:
+            if total <= self.max_bytes:
+                break
+            if not self.remove(filename):
+                self.warn('Could not evict a solution cache entry', filename)
+            total -= size
+
+    def clear(self):
+        """
+        Remove every entry from the cache.
+        """
+        for _, _, filename in self.entries():
+            if not self.remove(filename):
+                self.warn('Could not clear a solution cache entry', filename)
+
+    @staticmethod
+    def remove(filename):
+        """
+        Remove a cache file, ignoring files which no longer exist.
+        :return: True if the file is gone, False if it could not be removed
+        """
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        return True
@@ -0,0 +1,51 @@
+import io
+import unittest
+
+from maze_env import MazeEnv
+from maze_generator import MazeGenerator
+from search import Search
+
+"""
+test_maze_generator.py
+
+Checks that generated mazes can be read back by MazeEnv and that their
+optimal path cost matches the cost of the path found by BFS, including the
+room layout on small grids.
+"""
+
+SMALL_SIZES = [(3, 5), (5, 3), (5, 5), (6, 6), (9, 9), (15, 15), (21, 21),
+               (25, 25), (8, 31)]
+
+
+def read_back(generator):
+    f = io.BytesIO()
+    generator.write(f)
+    return MazeEnv.from_string(f.getvalue().decode())
+
+
+class TestMazeGenerator(unittest.TestCase):
+
+    def check(self, algorithm, n_rows, n_cols, seed):
+        generator = MazeGenerator(n_rows, n_cols, seed)
+        generator.generate(algorithm)
+        maze_env = read_back(generator)
+        path = Search(maze_env).search_bfs()
+        self.assertGreater(len(path), 0)
+        self.assertEqual(path.total_cost(MazeEnv.ACTION_COST),
+                         generator.optimal_cost)
+
+    def test_small_rooms(self):
+        for n_rows, n_cols in SMALL_SIZES:
+            for seed in range(20):
+                with self.subTest(size=(n_rows, n_cols), seed=seed):
+                    self.check('rooms', n_rows, n_cols, seed)
+
+    def test_algorithms(self):
+        for algorithm in MazeGenerator.ALGORITHMS:
+            for n_rows, n_cols in [(5, 5), (21, 31), (60, 41)]:
+                with self.subTest(algorithm=algorithm, size=(n_rows, n_cols)):
+                    self.check(algorithm, n_rows, n_cols, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import io
+import os
+import unittest
+
+import parallel_bfs
+from maze_env import MazeEnv
+from maze_generator import MazeGenerator
+from search import Search
+
+"""
+test_parallel_bfs.py
+
+Checks that the parallel BFS returns exactly the path found by the sequential
+BFS, with thresholds small enough that every step runs over the worker pool.
+"""
+
+MAZES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mazes')
+
+
+def generated_maze(algorithm, size, seed):
+    generator = MazeGenerator(size, size, seed)
+    generator.generate(algorithm)
+    f = io.BytesIO()
+    generator.write(f)
+    return MazeEnv.from_string(f.getvalue().decode())
+
+
+class TestParallelBFS(unittest.TestCase):
+
+    THRESHOLDS = {'SERIAL_THRESHOLD': 1, 'PARALLEL_THRESHOLD': 2,
+                  'MIN_SHARD_SIZE': 1, 'CHUNK_SIZE': 7}
+
+    def setUp(self):
+        self.saved = {name: getattr(parallel_bfs, name)
+                      for name in self.THRESHOLDS}
+        for name, value in self.THRESHOLDS.items():
+            setattr(parallel_bfs, name, value)
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(parallel_bfs, name, value)
+
+    def check(self, maze_env):
+        expected = Search(maze_env).search_bfs()
+        actual = Search(maze_env).search_parallel_bfs(processes=3)
+        self.assertEqual(actual, expected)
+
+    def test_maze_files(self):
+        for i in range(1, 4):
+            with self.subTest(maze=i):
+                self.check(MazeEnv(os.path.join(MAZES_DIR,
+                                                f'Maze-{i}.txt')))
+
+    def test_generated_mazes(self):
+        for algorithm in ['backtracker', 'kruskal', 'prim', 'rooms']:
+            for seed in range(2):
+                with self.subTest(algorithm=algorithm, seed=seed):
+                    self.check(generated_maze(algorithm, 41, seed))
+
+
+if __name__ == '__main__':
+    unittest.main()